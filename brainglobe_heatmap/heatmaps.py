@@ -196,13 +196,12 @@ class Heatmap:
         """
 
         # set brain regions colors
+        regions_by_name = {r.name: r for r in self.regions_meshes}
         for region, color in self.colors.items():
             if region == "root":
                 continue
 
-            self.scene.get_actors(br_class="brain region", name=region)[
-                0
-            ].color(color)
+            regions_by_name[region].color(color)
 
         if camera is None:
             # set camera position and render
@@ -355,15 +354,30 @@ class Heatmap:
 
         for r, coords in projected.items():
             name, segment = r.split("_segment_")
+            label = name if segment == "0" and name != "root" else None
+            zorder = -1 if name == "root" else None
+            alpha = 0.3 if name == "root" else None
+            # the open polylines of branching pieces have no inside to fill
+            if not np.array_equal(coords[0], coords[-1]):
+                ax.plot(
+                    coords[:, 0],
+                    coords[:, 1],
+                    color=self.colors[name],
+                    label=label,
+                    lw=1,
+                    zorder=zorder,
+                    alpha=alpha,
+                )
+                continue
             ax.fill(
                 coords[:, 0],
                 coords[:, 1],
                 color=self.colors[name],
-                label=name if segment == "0" and name != "root" else None,
+                label=label,
                 lw=1,
                 ec="k",
-                zorder=-1 if name == "root" else None,
-                alpha=0.3 if name == "root" else None,
+                zorder=zorder,
+                alpha=alpha,
             )
 
         if show_cbar:
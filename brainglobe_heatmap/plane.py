@@ -1,40 +1,215 @@
-from typing import Dict, List
+import os
+from dataclasses import dataclass
+from itertools import compress
+from typing import Iterator, List, Tuple
 
 import numpy as np
+import numpy.typing as npt
 import vedo as vd
 import vtkmodules.all as vtk
 from brainrender.actor import Actor
+from vtkmodules.util.numpy_support import vtk_to_numpy
 
 vtk.vtkLogger.SetStderrVerbosity(
     vtk.vtkLogger.VERBOSITY_OFF
 )  # remove logger's prints during intersect_with_plane()
 
+# let VTK's multithreaded filters (e.g. vtkPolyDataPlaneCutter) run on all the
+# available cores. This is a process-wide side effect of importing this module,
+# so it only happens if neither the user nor another library already picked an
+# SMP backend other than VTK's default sequential one
+if (
+    "VTK_SMP_BACKEND_IN_USE" not in os.environ
+    and vtk.vtkSMPTools.GetBackend() == "Sequential"
+):
+    vtk.vtkSMPTools.SetBackend("STDThread")
+    vtk.vtkSMPTools.Initialize()
+
+
+def _cross3(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Cross product of two 3D vectors, without the overhead
+    np.cross has on such small inputs
+    """
+    return np.array(
+        [
+            a[1] * b[2] - a[2] * b[1],
+            a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0],
+        ]
+    )
+
+
+def _bounds_corners(bounds: np.ndarray) -> np.ndarray:
+    """
+    Given the (N, 6) bounds of N meshes as (xmin, xmax, ymin, ymax, zmin, zmax)
+    returns the (N, 8, 3) coordinates of the corners of their bounding boxes
+    """
+    corners_idx = [[x, y, z] for x in (0, 1) for y in (2, 3) for z in (4, 5)]
+    return bounds[:, corners_idx]
+
+
+def _stitch(polylines: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Chains the polylines of a piece, given as arrays of point ids sorted by
+    decreasing length, end to end where they share an end point. A closed
+    chain is only extended with polylines that are closed too, so that it
+    stays closed
+    """
+    chains = []
+    unused = list(polylines)
+    while unused:
+        chain = unused.pop(0)
+        flipped = False
+        while True:
+            closed = chain[0] == chain[-1]
+            for i, line in enumerate(unused):
+                if closed and line[0] != line[-1]:
+                    continue
+                if line[0] == chain[-1]:
+                    chain = np.concatenate([chain, line[1:]])
+                elif line[-1] == chain[-1]:
+                    chain = np.concatenate([chain, line[-2::-1]])
+                else:
+                    continue
+                del unused[i]
+                break
+            else:
+                # extend an open chain from its other end too
+                if closed or flipped:
+                    break
+                chain, flipped = chain[::-1], True
+        chains.append(chain)
+    return sorted(chains, key=len, reverse=True)
+
+
+@dataclass
+class SliceResult:
+    """
+    The 2D coordinates of all the pieces of a plane's intersection with some
+    meshes, stored in a single (N, 2) buffer. The coordinates of the i-th
+    piece, named piece_names[i], are:
+        points[piece_offsets[i] : piece_offsets[i + 1]]
+    """
+
+    points: np.ndarray
+    piece_offsets: np.ndarray
+    piece_names: List[str]
+
+    def __post_init__(self) -> None:
+        self._piece_index = {
+            name: i for i, name in enumerate(self.piece_names)
+        }
+
+    def __len__(self) -> int:
+        return len(self.piece_names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.piece_names)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Returns the coordinates of the piece with the given name
+        """
+        return self.piece(self._piece_index[name])
+
+    def piece(self, i: int) -> np.ndarray:
+        return self.points[self.piece_offsets[i] : self.piece_offsets[i + 1]]
+
+    def keys(self) -> List[str]:
+        return self.piece_names
+
+    def values(self) -> Iterator[np.ndarray]:
+        """
+        Yields the coordinates (a view on points) of each piece
+        """
+        for i in range(len(self)):
+            yield self.piece(i)
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """
+        Yields the name and the coordinates (a view on points) of each piece
+        """
+        for i, name in enumerate(self.piece_names):
+            yield name, self.piece(i)
+
 
 class Plane:
     def __init__(
         self, origin: np.ndarray, u: np.ndarray, v: np.ndarray
     ) -> None:
-        self.center = origin
+        self.center = np.asarray(origin, dtype=np.float64)
         self.u = u / np.linalg.norm(u)
         self.v = v / np.linalg.norm(v)
         assert np.isclose(np.dot(self.u, self.v), 0), (
             f"The plane vectors must be orthonormal to each "
             f"other (u ⋅ v = {np.dot(self.u, self.v)})"
         )
-        self.normal = np.cross(self.u, self.v)
-        self.M = np.vstack([u, v]).T
+        self.normal = _cross3(self.u, self.v)
+        # C-contiguous and of the same dtype as the points in p3_to_p2
+        self.M = np.ascontiguousarray(
+            np.column_stack([self.u, self.v]), dtype=np.float64
+        )
+        self._center_proj = self.center @ self.M
+
+        # a single cutting pipeline, reused for every mesh sliced by the plane
+        self._vtk_plane = vtk.vtkPlane()
+        self._vtk_plane.SetOrigin(self.center.tolist())
+        self._vtk_plane.SetNormal(self.normal.tolist())
+        self._cutter = vtk.vtkPolyDataPlaneCutter()
+        self._cutter.SetPlane(self._vtk_plane)
+        self._cutter.ComputeNormalsOff()
+        # only the geometry of the intersection is needed
+        self._cutter.InterpolateAttributesOff()
+
+        # and a single pipeline joining the intersection's segments into
+        # polylines, split by connected piece
+        self._clean = vtk.vtkCleanPolyData()
+        # the zero-length segments made when cutting through a mesh vertex
+        # must not be turned into vertices, otherwise they'd break polylines
+        self._clean.ConvertLinesToPointsOff()
+        # merge the points that only differ by rounding errors, e.g. the
+        # duplicated vertices along the seam of a mesh, so that polylines
+        # crossing the seam are joined
+        self._clean.SetTolerance(1e-9)
+        self._connectivity = vtk.vtkPolyDataConnectivityFilter()
+        self._connectivity.SetExtractionModeToAllRegions()
+        self._connectivity.ColorRegionsOn()
+        self._connectivity.SetInputConnection(self._clean.GetOutputPort())
+        self._stripper = vtk.vtkStripper()
+        self._stripper.JoinContiguousSegmentsOn()
+        self._stripper.SetInputConnection(self._connectivity.GetOutputPort())
 
     @staticmethod
     def from_norm(origin: np.ndarray, norm: np.ndarray):
-        u = np.zeros(3)
-        m = np.where(norm != 0)[0][0]  # orientation can't be all-zeros
+        return Plane.from_norms_batch([origin], [norm])[0]
+
+    @staticmethod
+    def from_norms_batch(
+        origins: npt.ArrayLike, norms: npt.ArrayLike
+    ) -> List["Plane"]:
+        """
+        Creates one plane for each (N, 3) origin and normal, computing all
+        their u and v vectors at once
+        """
+        centers = np.asarray(origins, dtype=np.float64)
+        normals = np.asarray(norms, dtype=np.float64)
+        if not normals.any(axis=1).all():
+            raise ValueError("The planes' normals can't be all-zeros")
+
+        rows = np.arange(normals.shape[0])
+        us = np.zeros_like(normals)
+        m = np.argmax(normals != 0, axis=1)
         n = (m + 1) % 3
-        u[n] = norm[m]
-        u[m] = -norm[n]
-        norm = norm / np.linalg.norm(norm)
-        u = u / np.linalg.norm(u)
-        v = np.cross(norm, u)
-        return Plane(origin, u, v)
+        us[rows, n] = normals[rows, m]
+        us[rows, m] = -normals[rows, n]
+        normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+        us /= np.linalg.norm(us, axis=1, keepdims=True)
+        vs = np.cross(normals, us)
+        return [
+            Plane(center, u, v)
+            for center, u, v in zip(centers, us, vs, strict=True)
+        ]
 
     def to_mesh(self, actor: Actor):
         bounds = actor.bounds()
@@ -60,26 +235,137 @@ class Plane:
         # ps is a list of 3D points
         # returns a list of 2D point mapped on
         # the plane (u -> x axis, v -> y axis)
-        return (ps - self.center) @ self.M
+        ps = np.ascontiguousarray(ps, dtype=self.M.dtype)
+        # (ps - center) @ M, without allocating the centered points
+        projected = ps @ self.M
+        projected -= self._center_proj
+        return projected
 
     def intersect_with(self, mesh: vd.Mesh):
         return mesh.intersect_with_plane(
             origin=self.center, normal=self.normal
         )
 
-    # for Slicer.get_structures_slice_coords()
-    def get_projections(self, actors: List[Actor]) -> Dict[str, np.ndarray]:
-        projected = {}
+    def intersect_with_raw(self, mesh: vd.Mesh) -> vtk.vtkPolyData:
+        """
+        Same as intersect_with(), but returns the bare line segments of the
+        intersection, without making a vedo Mesh out of them.
+        The returned polydata is overwritten by the next call
+        """
+        self._cutter.SetInputData(mesh.dataset)
+        self._cutter.Update()
+        return self._cutter.GetOutput()
+
+    def _bounds_distances(self, actors: List[Actor]) -> np.ndarray:
+        """
+        Returns the (N, 8) signed distances to the plane of the corners of the
+        actors' bounding boxes, computed for all the actors at once
+        """
+        if not actors:
+            return np.zeros((0, 8))
+
+        # vtkPolyData caches its bounds until its points change, unlike
+        # vedo's bounds() that scans all the mesh's vertices at every call
+        bounds = np.array(
+            [actor._mesh.dataset.GetBounds() for actor in actors]
+        )
+        return (_bounds_corners(bounds) - self.center) @ self.normal
+
+    def crosses(self, actors: List[Actor]) -> np.ndarray:
+        """
+        Returns a boolean mask telling, for each actor, whether the plane
+        crosses its mesh's bounding box
+        """
+        dists = self._bounds_distances(actors)
+        return (dists.min(axis=1) <= 0) & (dists.max(axis=1) >= 0)
+
+    def in_front(self, actors: List[Actor]) -> np.ndarray:
+        """
+        Returns a boolean mask telling, for each actor, whether its mesh's
+        bounding box lies entirely on the side the plane's normal points to,
+        i.e. the side kept when cutting the mesh with the plane
+        """
+        return self._bounds_distances(actors).min(axis=1) > 0
+
+    def _ordered_pieces(self, polydata: vtk.vtkPolyData) -> List[np.ndarray]:
+        """
+        Joins the line segments of an intersection into polylines and returns
+        the points of each of them, in the order they are found along the
+        line. The polylines of a connected piece are stitched together where
+        they meet, so a piece is split into more than one polyline only if it
+        branches, in which case some of them may be open. Polylines are
+        grouped by piece, the longest first, and those collapsed to a single
+        point are left out
+        """
+        self._clean.SetInputData(polydata)
+        # by default polylines are split every 1000 segments. Longer contours
+        # are joined back together, but the joints' points are repeated
+        self._stripper.SetMaximumLength(
+            min(
+                polydata.GetNumberOfCells() + 1,
+                self._stripper.GetMaximumLengthMaxValue(),
+            )
+        )
+        self._stripper.Update()
+
+        joined = self._stripper.GetOutput()
+        lines = joined.GetLines()
+        if not lines.GetNumberOfCells():
+            return []
+
+        points = vtk_to_numpy(joined.GetPoints().GetData())
+        region_ids = vtk_to_numpy(joined.GetPointData().GetArray("RegionId"))
+        offsets = vtk_to_numpy(lines.GetOffsetsArray())
+        ids = vtk_to_numpy(lines.GetConnectivityArray())
+
+        # sort the polylines by piece and, within a piece, by decreasing length
+        lines_region = region_ids[ids[offsets[:-1]]]
+        order = np.lexsort((-np.diff(offsets), lines_region))
+        bounds = np.flatnonzero(np.diff(lines_region[order])) + 1
+
+        pieces = []
+        for piece_lines in np.split(order, bounds):
+            polylines = [ids[offsets[i] : offsets[i + 1]] for i in piece_lines]
+            if len(polylines) > 1:
+                polylines = _stitch(polylines)
+            for polyline in polylines:
+                # vtkStripper repeats the points where it joins its strips
+                repeated = np.r_[False, polyline[1:] == polyline[:-1]]
+                pieces.append(points[polyline[~repeated]])
+        # cutting along the seam of a mesh can leave zero-length polylines
+        return [piece for piece in pieces if not np.allclose(piece, piece[0])]
+
+    def slice_pieces(
+        self, actors: List[Actor]
+    ) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Intersects the actors' meshes with the plane and returns the ordered
+        3D points of all the resulting pieces in a single (N, 3) buffer,
+        together with the offsets of each piece in the buffer (piece i is
+        points[offsets[i]:offsets[i+1]]) and the pieces' names
+        """
+        # skip the meshes whose bounding box isn't crossed by the plane
+        actors = list(compress(actors, self.crosses(actors)))
+
+        names, pieces_points = [], []
         for actor in actors:
-            mesh: vd.Mesh = actor._mesh
-            intersection = self.intersect_with(mesh)
-            if not intersection.vertices.shape[0]:
+            cut = self.intersect_with_raw(actor._mesh)
+            if not cut.GetNumberOfPoints():
                 continue
-            pieces = intersection.split()  # intersection.split() in newer vedo
-            for piece_n, piece in enumerate(pieces):
-                # sort coordinates
-                points = piece.join(reset=True).vertices
-                projected[actor.name + f"_segment_{piece_n}"] = self.p3_to_p2(
-                    points
-                )
-        return projected
+            pieces = self._ordered_pieces(cut)
+            for piece_n, piece_points in enumerate(pieces):
+                names.append(actor.name + f"_segment_{piece_n}")
+                pieces_points.append(piece_points)
+
+        offsets = np.zeros(len(pieces_points) + 1, dtype=np.int64)
+        np.cumsum([len(points) for points in pieces_points], out=offsets[1:])
+        points = np.empty((offsets[-1], 3), dtype=np.float64)
+        for i, piece_points in enumerate(pieces_points):
+            points[offsets[i] : offsets[i + 1]] = piece_points
+        return points, offsets, names
+
+    # for Slicer.get_structures_slice_coords()
+    def get_projections(self, actors: List[Actor]) -> SliceResult:
+        points, offsets, names = self.slice_pieces(actors)
+        # project all the pieces at once
+        return SliceResult(self.p3_to_p2(points), offsets, names)
@@ -1,10 +1,11 @@
+from itertools import compress
 from typing import Dict, List, Optional, Union
 
 import numpy as np
 from brainrender.actor import Actor
 from brainrender.scene import Scene
 
-from brainglobe_heatmap.plane import Plane
+from brainglobe_heatmap.plane import Plane, SliceResult
 
 
 def get_ax_idx(orientation: str) -> int:
@@ -78,9 +79,10 @@ class Slicer:
             p1 = position + orientation * thickness  # type: ignore
 
             norm0 = orientation  # type: ignore
-            plane0 = Plane.from_norm(position, norm0)
             norm1 = -orientation  # type: ignore
-            plane1 = Plane.from_norm(p1, norm1)
+            plane0, plane1 = Plane.from_norms_batch(
+                [position, p1], [norm0, norm1]
+            )
 
         self.plane0 = Actor(
             plane0,
@@ -99,11 +101,15 @@ class Slicer:
         user given brain regions,
         returning the coordinates of each region as a
         set of XY (i.e., in the plane's
-        coordinates system) coordinates
+        coordinates system) coordinates.
+
+        The first returned value is a SliceResult holding the coordinates of
+        all the intersection's pieces. It maps each piece's name to its
+        coordinates through indexing, keys(), values() and items()
         """
         regions = regions + [root]
 
-        projected: Dict[str, np.ndarray] = self.plane0.get_projections(regions)
+        projected: SliceResult = self.plane0.get_projections(regions)
 
         # get output coordinates
         coordinates: Dict[str, List[np.ndarray]] = dict()
@@ -122,11 +128,14 @@ class Slicer:
         Slices regions' meshes with plane0 and adds the resulting intersection
         to the brainrender scene.
         """
-        for region in regions + [root]:
-            intersection = self.plane0.intersect_with(region._mesh)
+        sliced = regions + [root]
+        crossed = self.plane0.crosses(sliced)
+        for region, crosses in zip(sliced, crossed, strict=True):
+            if crosses:
+                intersection = self.plane0.intersect_with(region._mesh)
 
-            if len(intersection.vertices):
-                scene.add(intersection, transform=False)
+                if len(intersection.vertices):
+                    scene.add(intersection, transform=False)
 
             if region.name != "root":
                 scene.remove(region)
@@ -135,9 +144,13 @@ class Slicer:
         """
         Slices the meshes in a 3D brainrender scene using the gien planes
         """
-        # slice the scene
-        for _, plane in enumerate((self.plane0, self.plane1)):
-            scene.slice(plane, actors=regions, close_actors=True)
+        for plane in (self.plane0, self.plane1):
+            # cutting a mesh that is entirely on the kept side of the plane
+            # would leave it unchanged
+            cut = list(compress(regions, ~plane.in_front(regions)))
+            # with no actors, Scene.slice would cut the whole scene
+            if cut:
+                scene.slice(plane, actors=cut, close_actors=True)
 
         scene.slice(self.plane0, actors=scene.root, close_actors=False)
 
@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+import vedo as vd
+import vtkmodules.all as vtk
+from brainrender.actor import Actor
+from vtkmodules.util.numpy_support import (
+    numpy_to_vtk,
+    numpy_to_vtkIdTypeArray,
+)
+
+from brainglobe_heatmap.plane import Plane, SliceResult
+
+
+def make_actor(mesh: vd.Mesh, name: str) -> Actor:
+    actor = Actor(mesh, name=name, br_class="brain region")
+    # set by brainrender's Scene.add()
+    actor._mesh = actor.mesh
+    return actor
+
+
+def make_segments(points: np.ndarray, segments: np.ndarray) -> vtk.vtkPolyData:
+    polydata = vtk.vtkPolyData()
+    polydata.SetPoints(vtk.vtkPoints())
+    polydata.GetPoints().SetData(numpy_to_vtk(points, deep=True))
+    offsets = np.arange(0, 2 * len(segments) + 1, 2)
+    lines = vtk.vtkCellArray()
+    lines.SetData(
+        numpy_to_vtkIdTypeArray(offsets, deep=True),
+        numpy_to_vtkIdTypeArray(np.ravel(segments), deep=True),
+    )
+    polydata.SetLines(lines)
+    return polydata
+
+
+def ring(n: int) -> np.ndarray:
+    return np.column_stack([np.arange(n), (np.arange(n) + 1) % n])
+
+
+def test_from_norms_batch_matches_from_norm():
+    rng = np.random.default_rng(0)
+    origins = rng.normal(size=(6, 3))
+    norms = rng.normal(size=(6, 3))
+    # normals with zero components take a different path to build u
+    norms[1, 0] = 0
+    norms[2, :2] = 0
+    norms[3] = [0, 0, -2]
+
+    planes = Plane.from_norms_batch(origins, norms)
+
+    assert len(planes) == len(norms)
+    for plane, origin, norm in zip(planes, origins, norms, strict=True):
+        expected = Plane.from_norm(origin, norm)
+        np.testing.assert_allclose(plane.center, expected.center)
+        np.testing.assert_allclose(plane.normal, expected.normal)
+        np.testing.assert_allclose(plane.u, expected.u)
+        np.testing.assert_allclose(plane.v, expected.v)
+        np.testing.assert_allclose(plane.M, expected.M)
+        np.testing.assert_allclose(
+            plane.normal, norm / np.linalg.norm(norm), atol=1e-12
+        )
+
+
+def test_from_norms_batch_all_zeros_normal():
+    with pytest.raises(ValueError):
+        Plane.from_norms_batch([[0, 0, 0], [1, 2, 3]], [[1, 0, 0], [0, 0, 0]])
+
+
+def test_slice_sphere():
+    radius = 300
+    sphere = make_actor(vd.Sphere(r=radius, res=400), "sphere")
+    plane = Plane.from_norm(np.array([10, 0, 0]), np.array([0.3, 1, 0.1]))
+
+    projected = plane.get_projections([sphere])
+
+    assert projected.piece_names == ["sphere_segment_0"]
+    contour = projected.piece(0)
+    np.testing.assert_allclose(contour[0], contour[-1], atol=1e-6)
+    # a circle centred on the projection of the sphere's centre
+    distance = np.dot(plane.center, plane.normal)
+    expected_radius = np.sqrt(radius**2 - distance**2)
+    centre = plane.p3_to_p2(np.zeros((1, 3)))
+    np.testing.assert_allclose(
+        np.linalg.norm(contour - centre, axis=1), expected_radius, rtol=1e-3
+    )
+    perimeter = np.linalg.norm(np.diff(contour, axis=0), axis=1).sum()
+    np.testing.assert_allclose(
+        perimeter, 2 * np.pi * expected_radius, rtol=1e-3
+    )
+
+
+def test_slice_torus_equator():
+    r1, r2 = 100, 20
+    torus = make_actor(vd.Torus(r1=r1, r2=r2, res=60), "torus")
+    plane = Plane.from_norm(np.array([0, 0, 0]), np.array([0, 0, 1]))
+
+    projected = plane.get_projections([torus])
+
+    assert projected.piece_names == ["torus_segment_0", "torus_segment_1"]
+    radii = []
+    for _, contour in projected.items():
+        np.testing.assert_allclose(contour[0], contour[-1], atol=1e-6)
+        radii.append(np.linalg.norm(contour, axis=1).mean())
+    np.testing.assert_allclose(sorted(radii), [r1 - r2, r1 + r2], rtol=1e-3)
+
+
+def test_slice_skips_far_meshes():
+    near = make_actor(vd.Sphere(r=10), "near")
+    far = make_actor(vd.Sphere(r=10).pos(500, 0, 0), "far")
+    plane = Plane.from_norm(np.array([0, 0, 0]), np.array([1, 0, 0]))
+
+    np.testing.assert_array_equal(plane.crosses([near, far]), [True, False])
+    projected = plane.get_projections([near, far])
+    assert projected.piece_names == ["near_segment_0"]
+
+
+def test_slice_result_items():
+    points = np.arange(20, dtype=np.float64).reshape(10, 2)
+    offsets = np.array([0, 3, 3, 10])
+    names = ["a_segment_0", "b_segment_0", "b_segment_1"]
+    result = SliceResult(points, offsets, names)
+
+    items = list(result.items())
+
+    assert len(result) == 3
+    assert [name for name, _ in items] == names
+    for i, (name, coords) in enumerate(items):
+        np.testing.assert_array_equal(
+            coords, points[offsets[i] : offsets[i + 1]]
+        )
+        assert np.shares_memory(coords, points) or not len(coords)
+        np.testing.assert_array_equal(result[name], coords)
+    assert list(result) == list(result.keys()) == names
+    for values_coords, (_, coords) in zip(result.values(), items, strict=True):
+        np.testing.assert_array_equal(values_coords, coords)
+    with pytest.raises(KeyError):
+        result["c_segment_0"]
+
+
+def test_slice_result_empty():
+    result = SliceResult(np.empty((0, 2)), np.zeros(1, dtype=np.int64), [])
+
+    assert len(result) == 0
+    assert list(result.items()) == []
+    assert list(result.values()) == []
+    assert list(result.keys()) == []
+
+
+def test_ordered_pieces_stitches_branches():
+    # two squares sharing a corner: a single closed figure eight
+    points = np.array(
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]]
+        + [[-1, 0, 0], [-1, -1, 0], [0, -1, 0]],
+        dtype=np.float64,
+    )
+    segments = np.vstack([ring(4), [[0, 4], [4, 5], [5, 6], [6, 0]]])
+    plane = Plane.from_norm(np.zeros(3), np.array([0, 0, 1]))
+
+    pieces = plane._ordered_pieces(make_segments(points, segments))
+
+    assert len(pieces) == 1
+    np.testing.assert_array_equal(pieces[0][0], pieces[0][-1])
+    assert len(pieces[0]) == len(segments) + 1
+
+
+def test_ordered_pieces_keeps_loops_closed():
+    # a square with a dangling segment: the square stays a closed polyline
+    points = np.array(
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [2, 2, 0]],
+        dtype=np.float64,
+    )
+    segments = np.vstack([ring(4), [[2, 4]]])
+    plane = Plane.from_norm(np.zeros(3), np.array([0, 0, 1]))
+
+    pieces = plane._ordered_pieces(make_segments(points, segments))
+
+    assert [len(piece) for piece in pieces] == [5, 2]
+    np.testing.assert_array_equal(pieces[0][0], pieces[0][-1])
+    assert {tuple(p) for p in pieces[1]} == {(1, 1, 0), (2, 2, 0)}
+
+
+def test_ordered_pieces_stitches_long_contours():
+    plane = Plane.from_norm(np.zeros(3), np.array([0, 0, 1]))
+    # longer than the polylines vtkStripper can build
+    n = plane._stripper.GetMaximumLengthMaxValue() + 10
+    angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    points = np.column_stack([np.cos(angles), np.sin(angles), np.zeros(n)])
+
+    pieces = plane._ordered_pieces(make_segments(points, ring(n)))
+
+    assert len(pieces) == 1
+    np.testing.assert_array_equal(pieces[0][0], pieces[0][-1])
+    assert len(pieces[0]) == n + 1
@@ -0,0 +1,41 @@
+import numpy as np
+import vedo as vd
+from brainrender.scene import Scene
+
+from brainglobe_heatmap.slicer import Slicer
+
+from .test_plane import make_actor
+
+
+class OfflineScene:
+    """
+    The parts of brainrender's Scene used by Slicer.slice_scene, without
+    loading an atlas
+    """
+
+    slice = Scene.slice
+
+    def __init__(self, root):
+        self.root = root
+        self.clean_actors = []
+        self.plotter = None
+
+
+def test_slice_scene_closes_slab():
+    root = make_actor(vd.Sphere(r=1000, res=20), "root")
+    radius, thickness = 300, 40
+    region = make_actor(vd.Sphere(r=radius, res=60), "region")
+    inside = make_actor(vd.Sphere(r=5).pos(20, 0, 0), "inside")
+    inside_mesh = inside._mesh
+    # plane0 goes through some of the sphere's vertices
+    slicer = Slicer(np.array([0.0, 3.1, -1.7]), "frontal", thickness, root)
+
+    slicer.slice_scene(OfflineScene(root), [region, inside])
+
+    assert region._mesh.is_closed()
+    bounds = region._mesh.dataset.GetBounds()
+    np.testing.assert_allclose(bounds[:2], [0, thickness], atol=1e-6)
+    slab_volume = np.pi * (radius**2 * thickness - thickness**3 / 3)
+    np.testing.assert_allclose(region._mesh.volume(), slab_volume, rtol=1e-3)
+    # meshes within the slab aren't cut
+    assert inside._mesh is inside_mesh